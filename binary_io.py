@@ -7,7 +7,28 @@
 		with BinaryIO(file_object=fo) as bio:
 		with BinaryIO(io_object=iob) as bio:
 			bio.write(something, type_descr)
+			bio.write(something, type_descr, sort_keys=True)
 			something = bio.read(type_descr)
+			view = bio.read_bytes_view(bio.parse_type_descr('byt')[0])
+
+		A file opened by name is closed when the context exits, file and
+		io objects passed in are left open for the caller to reuse.
+
+		Inside the context, reads and writes are buffered; the buffers are
+		flushed when the context exits. Outside of it, every read and write
+		goes straight to the file object. Reads and writes may be mixed in
+		one context; call bio.flush() before using the underlying file
+		object directly.
+		Reads only go ahead of the caller on seekable file objects and
+		mmaps; pipes and sockets are read exactly as far as needed.
+
+		read_bytes_view() returns a memoryview sharing memory with BytesIO
+		and mmap file objects (a copy for other file objects); such views
+		must be released before the file object is closed.
+
+		Set members and map keys are written in iteration order, unless
+		the object is created with deterministic=True or write() is called
+		with sort_keys=True, in which case they are written sorted.
 			
 		type_descr:
 			== scalar types ==
@@ -18,11 +39,19 @@
 			'vec:element_type' vector of elements of scalar type 'element_type'
 			'set:member_type' set of members of scalar type 'member_type'
 			'map:key_type:value_type' map of key, value of scalar types 'key_type', 'value_type'
+			'mapc:key_type:value_type' map as above, stored as a column of keys followed by a column of values
+
+		Numeric vectors and sets are packed in bulk. A vector given as an
+		array.array, NumPy array or other buffer whose item format matches
+		element_type is written straight from its memory.
 			
 	Run module to test it
 """
 
+import array
+import functools
 import io
+import mmap
 import struct
 from contextlib import ContextDecorator
 
@@ -30,15 +59,23 @@ class ContextMixin(ContextDecorator):
 	"""Mixin for the 'with' context handler"""
 
 	def __enter__(self):
+		self._owns_file = False
 		if self.file_object is None:
 			if self.io_object is None:
-				self.file_object = self.open(self.name, '{}b'.format(self.mode))
+				self.file_object = open(self.name, '{}b'.format(self.mode))
+				self._owns_file = True
 			else:
 				self.file_object = self.io_object
 		return self
 
 	def __exit__(self, *exc):
-		self.file_object.close()
+		if self._owns_file:
+			self.file_object.close()
+		else:
+			# file and io objects passed in belong to the caller
+			flush = getattr(self.file_object, 'flush', None)
+			if flush is not None:
+				flush()
 		return False
 
 # static initialization of class variables
@@ -55,34 +92,143 @@ class BinaryIO(ContextMixin):
 		cls.STRING_TYPES = set(( 'str', 'sstr' ))
 		cls.BYTES_TYPES = set(( 'byt', 'sbyt' ))
 		cls.SCALAR_TYPES = cls.NUMERIC_FMT | cls.STRING_TYPES | cls.BYTES_TYPES
+		cls.CONTAINER_ARITY = { 'vec': 1, 'set': 1, 'map': 2, 'mapc': 2 }
 		cls.DEFAULT_ENC = 'utf-8'
+		cls.READ_BUFFER_SIZE = 64 << 10
+		cls.WRITE_BUFFER_SIZE = 64 << 10
+		cls.NUMBER_STRUCTS = { }
 		cls.NUMBER_SIZES = { }
 		cls.LONG_TYPE = 'I', None
 		cls.SHORT_TYPE = 'B', None
 		for fmt in cls.NUMERIC_FMT:
-			cls.NUMBER_SIZES[fmt] = len(struct.pack(fmt, 42))
-
-	def __init__(self, name=None, mode=None, file_object=None, io_object=None):
+			cls.NUMBER_STRUCTS[fmt] = struct.Struct(fmt)
+			cls.NUMBER_SIZES[fmt] = cls.NUMBER_STRUCTS[fmt].size
+		cls.LONG_STRUCT = cls.NUMBER_STRUCTS[cls.LONG_TYPE[0]]
+		cls.SHORT_STRUCT = cls.NUMBER_STRUCTS[cls.SHORT_TYPE[0]]
+		cls.LENGTH_STRUCTS = {
+			'str': cls.LONG_STRUCT, 'byt': cls.LONG_STRUCT,
+			'sstr': cls.SHORT_STRUCT, 'sbyt': cls.SHORT_STRUCT }
+
+	def __init__(self, name=None, mode=None, file_object=None, io_object=None, deterministic=False):
 		self.name = name
 		self.mode = mode
 		self.file_object = file_object
 		self.io_object = io_object
+		self.deterministic = deterministic
+		self._rbuf = b''
+		self._rpos = 0
+		self._rend = 0
+		self._read_ahead = 0
+		self._wbuf = bytearray()
+		self._write_limit = 0
+		self._zero_copy = False
+
+	def __enter__(self):
+		super().__enter__()
+		self._zero_copy = isinstance(self.file_object, (io.BytesIO, mmap.mmap))
+		# read ahead only where unread bytes can be given back on flush
+		if self._rewindable(self.file_object):
+			self._read_ahead = self.READ_BUFFER_SIZE
+		self._write_limit = self.WRITE_BUFFER_SIZE
+		return self
+
+	def __exit__(self, *exc):
+		try:
+			self.flush()
+		finally:
+			# outside the context, reads and writes go straight to the file object
+			self._read_ahead = 0
+			self._write_limit = 0
+			super().__exit__(*exc)
+		return False
+
+	@staticmethod
+	def _rewindable(file_object):
+		"""True if file_object can seek back over read-ahead"""
+		if isinstance(file_object, mmap.mmap):
+			return True
+		seekable = getattr(file_object, 'seekable', None)
+		return seekable is not None and seekable()
+
+	def flush(self):
+		"""Give back unread data and write out buffered data to the underlying file object"""
+		self._give_back()
+		if self._wbuf:
+			self.file_object.write(self._wbuf)
+			self._wbuf.clear()
+
+	def _give_back(self):
+		"""Seek back over read-ahead, so the file position is right after the last item read"""
+		unread = self._rend - self._rpos
+		if unread:
+			# only rewindable file objects are read ahead of the caller
+			self.file_object.seek(-unread, io.SEEK_CUR)
+		self._rbuf = b''
+		self._rpos = self._rend = 0
+
+	def _fill(self, length):
+		"""Make length bytes available in the read buffer, fewer only at end of file"""
+		available = self._rend - self._rpos
+		if available < length:
+			if self._wbuf:
+				# reading after writing: the file must see the writes first
+				self.file_object.write(self._wbuf)
+				self._wbuf.clear()
+			data = self.file_object.read(max(length - available, self._read_ahead))
+			self._rbuf = self._rbuf[self._rpos:self._rend] + data
+			self._rpos = 0
+			self._rend = len(self._rbuf)
 
 	def _in(self, length):
-		return self.file_object.read(length)
+		self._fill(length)
+		pos = self._rpos
+		self._rpos = min(pos + length, self._rend)
+		return self._rbuf[pos:self._rpos]
+
+	def _in_view(self, length):
+		"""Like _in, but returns a memoryview into the file object where possible"""
+		if not self._zero_copy:
+			return memoryview(self._in(length))
+		if self._wbuf:
+			self.flush()
+		if isinstance(self.file_object, io.BytesIO):
+			source = self.file_object.getbuffer()
+		else:
+			source = memoryview(self.file_object)
+		buffered = self._rend - self._rpos
+		pos = self.file_object.tell() - buffered
+		view = source[pos:pos + length]
+		if len(view) <= buffered:
+			self._rpos += len(view)
+		else:
+			self._rbuf = b''
+			self._rpos = self._rend = 0
+			self.file_object.seek(pos + len(view))
+		return view
+
+	def _unpack(self, s):
+		"""Unpack the struct.Struct s from the read buffer"""
+		self._fill(s.size)
+		values = s.unpack_from(self._rbuf, self._rpos)
+		self._rpos += s.size
+		return values
 
 	def _out(self, data):
-		return self.file_object.write(data)
+		if self._rend:
+			# writing after reading: write where the last item read ended
+			self._give_back()
+		self._wbuf += data
+		if len(self._wbuf) >= self._write_limit:
+			self.flush()
+		return len(data)
 
 	def read_number(self, number_type):
 		fmt, enc = number_type # enc is ignored for numbers
-		if not fmt in self.NUMERIC_FMT:
-			raise ValueError('format {} unsupported, number expected'.format(fmt))
-		return struct.unpack(fmt, self._in(self.NUMBER_SIZES[fmt]))[0]
+		return self._unpack(self.NUMBER_STRUCTS[fmt])[0]
 			
 	def write_number(self, number, number_type):
 		fmt, enc = number_type # enc is ignored for numbers
-		return self._out(struct.pack(fmt, number))
+		return self._out(self.NUMBER_STRUCTS[fmt].pack(number))
 
 	def read_byte(self, number):
 		number_type = self.SHORT_TYPE
@@ -92,126 +238,177 @@ class BinaryIO(ContextMixin):
 		number_type = self.SHORT_TYPE
 		return self.write_number(number, number_type)
 
-	def _fmt_to_len_type(self, fmt):
-		len_type = self.SHORT_TYPE
-		if fmt == 'byt' or fmt == 'str':
-			len_type = self.LONG_TYPE
-		return len_type
-
-	def _get_len_and_fmt(self, sequence, fmt):
-		length = len(sequence)
-		typ, enc = self._fmt_to_len_type(fmt)
-		if typ == 'B' and length > 255:
-			raise ValueError('not a short string/bytes sequence')
-		return length, (typ, enc)
+	def _in_short_length(self):
+		"""Read a one byte length prefix straight from the read buffer"""
+		# the payload usually follows in the same buffered block
+		self._fill(1)
+		if self._rpos == self._rend:
+			raise struct.error('unpack requires a buffer of 1 bytes')
+		length = self._rbuf[self._rpos]
+		self._rpos += 1
+		return length
+
+	def _in_length(self, length_struct):
+		"""Read a length prefix packed with length_struct"""
+		if length_struct.size == 1:
+			return self._in_short_length()
+		return self._unpack(length_struct)[0]
+
+	def _out_sized(self, _bytes, length_struct):
+		"""Write _bytes preceded by its length, straight into the write buffer"""
+		try:
+			prefix = length_struct.pack(len(_bytes))
+		except struct.error:
+			raise ValueError('not a short string/bytes sequence') from None
+		self._wbuf += prefix
+		return self._out(_bytes) + len(prefix)
 		
 	def read_bytes(self, item_type):
-		fmt, enc = item_type # enc is ignored for bytes
-		number_type = self._fmt_to_len_type(fmt)
-		length = self.read_number(number_type)
-		return self._in(length)
+		return self._compile_scalar(item_type)[0](self)
 
-	def write_bytes(self, _bytes, item_type):
+	def read_bytes_view(self, item_type):
 		fmt, enc = item_type # enc is ignored for bytes
-		length, number_type = self._get_len_and_fmt(_bytes, fmt)
-		n = self.write_number(length, number_type)
-		return n + self._out(_bytes)
-
-	def _decode_string(self, _bytes, enc):
-		if not enc:
-			enc = self.DEFAULT_ENC
-		return _bytes.decode(enc)
+		return self._in_view(self._in_length(self.LENGTH_STRUCTS[fmt]))
 
-	def _encode_string(self, string, enc):
-		if not enc:
-			enc = self.DEFAULT_ENC
-		return bytes(string, encoding=enc)
+	def write_bytes(self, _bytes, item_type):
+		return self._compile_scalar(item_type)[1](self, _bytes)
 
 	def read_string(self, item_type):
-		fmt, enc = item_type
-		number_type = self._fmt_to_len_type(fmt)
-		length = self.read_number(number_type)
-		_bytes = self._in(length)
-		return self._decode_string(_bytes, enc)
+		return self._compile_scalar(item_type)[0](self)
 
 	def write_string(self, string, item_type):
-		fmt, enc = item_type
-		_bytes = self._encode_string(string, enc)
-		length, number_type = self._get_len_and_fmt(_bytes, fmt)
-		n = self.write_number(length, number_type)		
-		return n + self._out(_bytes)
+		return self._compile_scalar(item_type)[1](self, string)
+
+	def _read_numbers(self, fmt, count):
+		# numeric formats are native, so array typecodes match them and no
+		# byte swapping is needed
+		size = count * self.NUMBER_SIZES[fmt]
+		self._fill(size)
+		if self._rend - self._rpos < size:
+			raise struct.error('unpack requires a buffer of {} bytes'.format(size))
+		numbers = array.array(fmt)
+		with memoryview(self._rbuf) as data:
+			numbers.frombytes(data[self._rpos:self._rpos + size])
+		self._rpos += size
+		return numbers.tolist()
+
+	def _write_numbers(self, numbers, fmt):
+		try:
+			data = memoryview(numbers)
+		except TypeError:
+			data = None
+		if data is not None and data.format == fmt and data.ndim == 1 and data.c_contiguous:
+			# array.array, NumPy arrays and the like: already laid out as on the wire
+			with data, data.cast('B') as raw:
+				return self._out(raw)
+		if isinstance(numbers, (bytes, bytearray)):
+			# array.array would take these as raw machine bytes, not as values
+			numbers = list(numbers)
+		try:
+			numbers = array.array(fmt, numbers)
+		except (OverflowError, TypeError) as e:
+			# same error type as packing a single number
+			raise struct.error(str(e)) from e
+		return self._out(numbers.tobytes())
+
+	def _read_column(self, item_type, count):
+		"""Read count items of scalar type item_type into a list"""
+		if item_type[0] in self.NUMERIC_FMT:
+			return self._read_numbers(item_type[0], count)
+		reader = self._compile_scalar(item_type)[0]
+		items = [ None ] * count
+		for i in range(count):
+			items[i] = reader(self)
+		return items
+
+	def _write_column(self, items, item_type):
+		"""Write items of scalar type item_type, without a length prefix"""
+		if item_type[0] in self.NUMERIC_FMT:
+			return self._write_numbers(items, item_type[0])
+		writer = self._compile_scalar(item_type)[1]
+		n = 0
+		for item in items:
+			n += writer(self, item)
+		return n
 
 	def read_vector(self, element_type):
-		vector = [ ]
 		l = self.read_number(self.LONG_TYPE)
-		for i in range(l):
-			vector.append(self.read_scalar(element_type))
-		return vector
+		return self._read_column(element_type, l)
 
 	def write_vector(self, vector, element_type):
 		if vector is None:
 			vector = [ ]
 		n = self.write_number(len(vector), self.LONG_TYPE)
-		for element in vector:
-			n += self.write_scalar(element, element_type)
-		return n
+		return n + self._write_column(vector, element_type)
 
 	def read_set(self, member_type):
-		s = set()
 		l = self.read_number(self.LONG_TYPE)
-		for i in range(l):
-			s.add(self.read_scalar(member_type))
-		return s
+		return set(self._read_column(member_type, l))
+
+	def _ordered(self, items, sort_keys):
+		if sort_keys is None:
+			sort_keys = self.deterministic
+		if sort_keys:
+			return sorted(items)
+		return items
 
-	def write_set(self, s, member_type):
+	def write_set(self, s, member_type, sort_keys=None):
 		n = self.write_number(len(s), self.LONG_TYPE)
-		for member in sorted(s):
-			n += self.write_scalar(member, member_type)
-		return n
+		return n + self._write_column(self._ordered(s, sort_keys), member_type)
 
 	def read_map(self, key_type, value_type):
 		m = { }		
 		l = self.read_number(self.LONG_TYPE)
+		read_key = self._compile_scalar(key_type)[0]
+		read_value = self._compile_scalar(value_type)[0]
 		for i in range(l):
-			key = self.read_scalar(key_type)
-			value = self.read_scalar(value_type)
+			key = read_key(self)
+			value = read_value(self)
 			if key in m:
 				raise ValueError('duplicate key {}'.format(key))
 			m[key] = value			
 		return m
 
-	def write_map(self, m, key_type, value_type):
+	def write_map(self, m, key_type, value_type, sort_keys=None):
 		n = self.write_number(len(m), self.LONG_TYPE)
-		for key, value in sorted(m.items()):
-			n += self.write_scalar(key, key_type)
-			n += self.write_scalar(value, value_type)
+		write_key = self._compile_scalar(key_type)[1]
+		write_value = self._compile_scalar(value_type)[1]
+		for key in self._ordered(m, sort_keys):
+			n += write_key(self, key)
+			n += write_value(self, m[key])
 		return n
 
+	def read_mapc(self, key_type, value_type):
+		l = self.read_number(self.LONG_TYPE)
+		keys = self._read_column(key_type, l)
+		values = self._read_column(value_type, l)
+		m = dict(zip(keys, values))
+		if len(m) != l:
+			seen = set()
+			for key in keys:
+				if key in seen:
+					raise ValueError('duplicate key {}'.format(key))
+				seen.add(key)
+		return m
+
+	def write_mapc(self, m, key_type, value_type, sort_keys=None):
+		keys = self._ordered(m, sort_keys)
+		values = [ m[key] for key in keys ]
+		n = self.write_number(len(m), self.LONG_TYPE)
+		n += self._write_column(keys, key_type)
+		return n + self._write_column(values, value_type)
+
 	def read_scalar(self, item_type):
-		typ, enc = item_type # enc is ignored here
-		if typ in self.NUMERIC_FMT:
-			return self.read_number(item_type)
-		elif typ in self.STRING_TYPES:
-			return self.read_string(item_type)
-		elif typ in self.BYTES_TYPES:
-			return self.read_bytes(item_type)
-		else:
-			raise ValueError('type {} unsupported, scalar expected'.format(typ))
+		return self._compile_scalar(item_type)[0](self)
 
 	def write_scalar(self, item, item_type):
-		typ, enc = item_type # enc is ignored here
-		if typ in self.NUMERIC_FMT:
-			return self.write_number(item, item_type)
-		elif typ in self.STRING_TYPES:
-			return self.write_string(item, item_type)
-		elif typ in self.BYTES_TYPES:
-			return self.write_bytes(item, item_type)
-		else:
-			raise ValueError('value_type {} unsupported, scalar expected'.format(typ))
+		return self._compile_scalar(item_type)[1](self, item)
 			
-	def parse_type_descr(self, type_descr):
+	@classmethod
+	@functools.lru_cache(maxsize=None)
+	def parse_type_descr(cls, type_descr):
 		type_components = type_descr.split(':')
-		l = [ ]		
+		l = [ ]
 		for type_component in type_components:
 			typ = type_component
 			enc = None
@@ -219,38 +416,140 @@ class BinaryIO(ContextMixin):
 				i = typ.index('/')
 				typ = type_component[:i]
 				enc = type_component[i+1:]
+			if typ in cls.STRING_TYPES:
+				if not enc:
+					enc = cls.DEFAULT_ENC
+				try:
+					# also rejects codecs that are not text encodings, e.g. base64
+					''.encode(enc)
+				except LookupError:
+					raise ValueError('encoding {} unsupported'.format(enc)) from None
 				
 			l.append(( typ, enc ))
-		return l
 
-	def read(self, type_descr):
-		type_components = self.parse_type_descr(type_descr)
-		typ, enc = type_components[0] # enc is ignored here
-		if typ in self.SCALAR_TYPES:
-			return self.read_scalar(type_components[0])
-		elif typ == 'vec':
-			return self.read_vector(type_components[1])
-		elif typ == 'set':
-			return self.read_set(type_components[1])
-		elif typ == 'map':
-			return self.read_map(type_components[1], type_components[2])
+		# validate once here, so the handlers need not check their types
+		typ, enc = l[0] # enc is ignored here
+		if typ in cls.SCALAR_TYPES:
+			arity = 0
+		elif typ in cls.CONTAINER_ARITY:
+			arity = cls.CONTAINER_ARITY[typ]
 		else:
 			raise ValueError('type {} unsupported'.format(typ))
+		if len(l) != arity + 1:
+			raise ValueError('type {} takes {} scalar type(s), got {}'.format(typ, arity, len(l) - 1))
+		for typ, enc in l[1:]:
+			if typ not in cls.SCALAR_TYPES:
+				raise ValueError('type {} unsupported, scalar expected'.format(typ))
+		return tuple(l)
+
+	@staticmethod
+	def _bind(read, write, args, keyed):
+		"""(reader, writer) calling the generic handlers read/write with args"""
+		def reader(bio):
+			return read(bio, *args)
+		if keyed:
+			def writer(bio, item, sort_keys):
+				return write(bio, item, *args, sort_keys=sort_keys)
+		else:
+			def writer(bio, item, sort_keys):
+				return write(bio, item, *args)
+		return reader, writer
+
+	@classmethod
+	@functools.lru_cache(maxsize=None)
+	def _compile_scalar(cls, item_type):
+		"""(reader, writer) for a scalar item_type, with its structs and encoding resolved
+
+		reader(bio) returns the item read, writer(bio, item) returns the
+		number of bytes written. This is the one codec for scalars, used by
+		the handlers, the container loops and read()/write().
+		"""
+		typ, enc = item_type
+		if typ in cls.NUMERIC_FMT:
+			s = cls.NUMBER_STRUCTS[typ]
+			def reader(bio):
+				return bio._unpack(s)[0]
+			def writer(bio, number, sort_keys=None):
+				return bio._out(s.pack(number))
+			return reader, writer
+		elif typ not in cls.STRING_TYPES and typ not in cls.BYTES_TYPES:
+			raise ValueError('type {} unsupported, scalar expected'.format(typ))
+
+		length_struct = cls.LENGTH_STRUCTS[typ]
+		if length_struct.size == 1:
+			def read_bytes(bio):
+				return bio._in(bio._in_short_length())
+		else:
+			def read_bytes(bio):
+				return bio._in(bio._unpack(length_struct)[0])
+		if typ in cls.STRING_TYPES:
+			enc = enc or cls.DEFAULT_ENC
+			def reader(bio):
+				return read_bytes(bio).decode(enc)
+			def writer(bio, string, sort_keys=None):
+				return bio._out_sized(string.encode(enc), length_struct)
+		else:
+			reader = read_bytes
+			def writer(bio, _bytes, sort_keys=None):
+				return bio._out_sized(_bytes, length_struct)
+		return reader, writer
+
+	@classmethod
+	def _compile_numbers(cls, fmt, container):
+		length_struct = cls.LONG_STRUCT
+		if container is set:
+			def reader(bio):
+				count, = bio._unpack(length_struct)
+				return set(bio._read_numbers(fmt, count))
+			def writer(bio, numbers, sort_keys):
+				n = bio._out(length_struct.pack(len(numbers)))
+				return n + bio._write_numbers(bio._ordered(numbers, sort_keys), fmt)
+		else:
+			def reader(bio):
+				count, = bio._unpack(length_struct)
+				return bio._read_numbers(fmt, count)
+			def writer(bio, numbers, sort_keys):
+				if numbers is None:
+					numbers = [ ]
+				n = bio._out(length_struct.pack(len(numbers)))
+				return n + bio._write_numbers(numbers, fmt)
+		return reader, writer
 
-	def write(self, item, type_descr):
-		type_components = self.parse_type_descr(type_descr)
+	@classmethod
+	@functools.lru_cache(maxsize=None)
+	def _compile(cls, type_descr):
+		"""(reader, writer) specialized for type_descr, built once per class and descriptor
+
+		reader(bio) returns the item read, writer(bio, item, sort_keys)
+		returns the number of bytes written. Scalars and numeric vectors
+		and sets get dedicated functions, everything else is bound to the
+		generic handler for its type.
+		"""
+		type_components = cls.parse_type_descr(type_descr)
 		typ, enc = type_components[0] # enc is ignored here
-		if typ in self.SCALAR_TYPES:
-			return self.write_scalar(item, type_components[0])
+		if typ in cls.SCALAR_TYPES:
+			return cls._compile_scalar(type_components[0])
 		elif typ == 'vec':
-			return self.write_vector(item, type_components[1])
+			if type_components[1][0] in cls.NUMERIC_FMT:
+				return cls._compile_numbers(type_components[1][0], list)
+			return cls._bind(cls.read_vector, cls.write_vector, type_components[1:2], False)
 		elif typ == 'set':
-			return self.write_set(item, type_components[1])
+			if type_components[1][0] in cls.NUMERIC_FMT:
+				return cls._compile_numbers(type_components[1][0], set)
+			return cls._bind(cls.read_set, cls.write_set, type_components[1:2], True)
 		elif typ == 'map':
-			return self.write_map(item, type_components[1], type_components[2])
+			return cls._bind(cls.read_map, cls.write_map, type_components[1:3], True)
+		elif typ == 'mapc':
+			return cls._bind(cls.read_mapc, cls.write_mapc, type_components[1:3], True)
 		else:
 			raise ValueError('type {} unsupported'.format(typ))
 
+	def read(self, type_descr):
+		return self._compile(type_descr)[0](self)
+
+	def write(self, item, type_descr, sort_keys=None):
+		return self._compile(type_descr)[1](self, item, sort_keys)
+
 if __name__ == '__main__':
 	def assert_deep_equal(lhs, rhs):
 		assert type(lhs) == type(rhs)
@@ -279,6 +578,7 @@ if __name__ == '__main__':
 	the_number = 4711
 	the_string = 'a quick brown fox jümps over the läzy d0g'
 	the_byte_vector = [ 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, -19 ]
+	the_int_vector = list(range(-100000, 100000, 997))
 	the_string_vector = [ 'egg', 'spam', 'bacon', 'ham', 'räksmörgås' ]
 	the_long_set = set( ( 9223372036854775807, 4611686018427387903, 2305843009213693951 ) )
 	the_str_long_map = { 'xyzzy': 42, 'bar':4711, 'swag':31412359 }
@@ -289,10 +589,14 @@ if __name__ == '__main__':
 		[ the_string, 'sstr/utf-8' ],
 		[ the_number, 'i' ],
 		[ the_byte_vector, 'vec:b' ],
+		[ the_int_vector, 'vec:i' ],
+		[ [ ], 'vec:I' ],
 		[ the_string_vector, 'vec:sstr/latin-1' ],
 		[ the_long_set, 'set:L' ],
 		[ the_str_long_map, 'map:str/ascii:L' ],
 		[ the_int_number_map, 'map:i:I' ],
+		[ the_int_number_map, 'mapc:i:I' ],
+		[ the_str_long_map, 'mapc:sstr/ascii:L' ],
 		[ the_bytes_sequence, 'sbyt' ] ]
 
 	io_object=io.BytesIO()
@@ -302,7 +606,8 @@ if __name__ == '__main__':
 	with BinaryIO(io_object=io_object) as bio:
 		for item, type_descr in the_things:
 			n += bio.write(item, type_descr)
-		written_bytes = bytes(io_object.getbuffer())
+
+	written_bytes = bytes(io_object.getbuffer())
 
 	assert n == len(written_bytes)
 
@@ -313,4 +618,76 @@ if __name__ == '__main__':
 			roundtrip = bio.read(type_descr)
 			assert_deep_equal(item, roundtrip)
 
+	for io_object in io.BytesIO(), mmap.mmap(-1, len(written_bytes)):
+		io_object.write(written_bytes)
+		io_object.seek(0)
+		with BinaryIO(io_object=io_object) as bio:
+			for item, type_descr in the_things:
+				item_type = bio.parse_type_descr(type_descr)[0]
+				if item_type[0] in bio.BYTES_TYPES:
+					view = bio.read_bytes_view(item_type)
+					assert view == item
+					view.release()
+				else:
+					roundtrip = bio.read(type_descr)
+					assert_deep_equal(item, roundtrip)
+
+	# leave the context after a partial read: the read-ahead is given back
+	for io_object in io.BytesIO(), mmap.mmap(-1, len(written_bytes)):
+		io_object.write(written_bytes)
+		io_object.seek(0)
+		n = 0
+		for item, type_descr in the_things[:2]:
+			with BinaryIO(io_object=io_object) as bio:
+				roundtrip = bio.read(type_descr)
+			assert_deep_equal(item, roundtrip)
+			with BinaryIO(io_object=io.BytesIO()) as bio:
+				n += bio.write(item, type_descr)
+			assert io_object.tell() == n
+
+	# mixing reads and writes in one context keeps their file positions
+	io_object = io.BytesIO()
+	with BinaryIO(io_object=io_object) as bio:
+		bio.write([ 0, 1, 2, 3 ], 'vec:i')
+	io_object.seek(0)
+	with BinaryIO(io_object=io_object) as bio:
+		assert bio.read('I') == 4
+		assert bio.read('i') == 0
+		bio.write(99, 'i')
+		assert bio.read('i') == 2
+		bio.write(42, 'i')
+	io_object.seek(0)
+	with BinaryIO(io_object=io_object) as bio:
+		assert bio.read('vec:i') == [ 0, 99, 2, 42 ]
+
+	# vectors given as buffers must be written like the equivalent list
+	the_small_vector = [ 1, 2, 3, 4, 127 ]
+	for values, type_descr, vectors in [
+			[ the_int_vector, 'vec:i', [ array.array('i', the_int_vector) ] ],
+			[ the_small_vector, 'vec:i', [ bytes(the_small_vector), bytearray(the_small_vector) ] ],
+			[ the_small_vector, 'vec:b', [ bytes(the_small_vector), bytearray(the_small_vector) ] ] ]:
+		vector_bytes = [ ]
+		for vector in [ values ] + vectors:
+			io_object = io.BytesIO()
+			with BinaryIO(io_object=io_object) as bio:
+				bio.write(vector, type_descr)
+			vector_bytes.append(bytes(io_object.getbuffer()))
+		assert all(b == vector_bytes[0] for b in vector_bytes)
+
+	for type_descr in 'bogus', 'vec', 'map:i', 'set:vec', 'str/bogus', 'sstr/base64':
+		try:
+			BinaryIO().write(the_number, type_descr)
+		except ValueError:
+			pass
+		else:
+			raise AssertionError('type_descr {} accepted'.format(type_descr))
+
+	for item, type_descr in [ 200, 'b' ], [ [ 200 ], 'vec:b' ], [ b'\xff', 'vec:b' ], [ [ 'x' ], 'vec:i' ]:
+		try:
+			BinaryIO(file_object=io.BytesIO()).write(item, type_descr)
+		except struct.error:
+			pass
+		else:
+			raise AssertionError('{} accepted as {}'.format(item, type_descr))
+
 	print(written_bytes)